@@ -14,7 +14,10 @@ COPY . .
 
 # Railway provides PORT dynamically; default to 8000 for local docker run.
 ENV PORT=8000
+# One BLAS thread per process; concurrency comes from the optimize pool or
+# $WEB_CONCURRENCY uvicorn workers (see main.py).
+ENV OMP_NUM_THREADS=1 OPENBLAS_NUM_THREADS=1 MKL_NUM_THREADS=1
 EXPOSE 8000
 
-# Use shell form so $PORT expands at runtime.
-CMD ["sh", "-c", "uvicorn main:app --host 0.0.0.0 --port ${PORT}"]
+# main.py reads $PORT and $WEB_CONCURRENCY (default 1 web worker + optimize pool).
+CMD ["python", "main.py"]
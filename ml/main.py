@@ -2,14 +2,31 @@
 FRONTIER ALPHA - Python ML Engine
 FastAPI server for heavy ML computations.
 Hosts: Railway (port from $PORT env var, falls back to 8000).
+
+Concurrency has a single knob, $WEB_CONCURRENCY (uvicorn workers, default 1):
+  - 1: one web process; /optimize fans out to a process pool sized to the
+    CPUs this process may run on.
+  - >1: that many web processes; each solves /optimize in a thread, so the
+    web workers are the only layer of process parallelism.
+Set it to the container's CPU quota when the host has more cores than you pay for.
 """
 import os
+
+# Parallelism comes from processes (pool or uvicorn workers); keep BLAS
+# single-threaded so it doesn't multiply on top. Must run before numpy loads.
+for _var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(_var, "1")
+
 import asyncio
 import json
 import re
-from typing import List, Dict, Optional
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Optional, Tuple
 
 import httpx
+import numpy as np
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 
@@ -25,6 +42,13 @@ class OptimizeRequest(BaseModel):
     risk_free_rate: float = 0.05
 
 
+TRADING_DAYS = 252.0
+
+
+class OptimizeInputError(ValueError):
+    """Request data the optimizer can't work with; surfaced as a 422."""
+
+
 @app.get("/health")
 async def health():
     return {
@@ -35,37 +59,182 @@ async def health():
     }
 
 
-@app.post("/optimize")
-async def optimize(request: OptimizeRequest):
-    """Run portfolio optimization with PyPortfolioOpt."""
-    from pypfopt import expected_returns, risk_models, EfficientFrontier
-    import pandas as pd
+# CPU-bound solves run off the event loop so it keeps serving /health and
+# /sentiment while an optimization is in flight. None means the loop's default
+# thread pool (used when uvicorn workers already provide the parallelism).
+EXECUTOR: Optional[ProcessPoolExecutor] = None
+
+
+def _available_cpus() -> int:
+    # Affinity respects cpusets/taskset; cpu_count() would report every host core.
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _new_executor() -> Optional[ProcessPoolExecutor]:
+    if int(os.environ.get("WEB_CONCURRENCY", 1)) > 1:
+        return None
+    return ProcessPoolExecutor(max_workers=_available_cpus())
+
+
+def _replace_executor(broken: ProcessPoolExecutor) -> None:
+    """Swap out a pool whose worker died; concurrent callers replace it only once."""
+    global EXECUTOR
+    if EXECUTOR is broken:
+        broken.shutdown(wait=False, cancel_futures=True)
+        EXECUTOR = _new_executor()
+
+
+@app.on_event("startup")
+async def _start_executor():
+    global EXECUTOR
+    EXECUTOR = _new_executor()
+
+
+@app.on_event("shutdown")
+async def _stop_executor():
+    if EXECUTOR is not None:
+        EXECUTOR.shutdown(wait=False, cancel_futures=True)
+
+
+def _ledoit_wolf(R: np.ndarray) -> np.ndarray:
+    """Ledoit-Wolf shrinkage toward a scaled identity (same estimator as sklearn).
+
+    R is T x N. Everything O(T*N^2) goes through two GEMMs; the fourth-moment
+    term uses (X**2).T @ (X**2) so no T x N x N tensor is ever built.
+    """
+    n, p = R.shape
+    X = R - R.mean(axis=0)
+    S = (X.T @ X) / n
+    if p == 1:
+        return S
 
-    df = pd.DataFrame(request.returns, index=request.symbols).T
+    m = np.trace(S) / p
+    target = m * np.eye(p)
+    d2 = np.sum((S - target) ** 2) / p
+    if d2 == 0.0:
+        return S
 
-    mu = expected_returns.mean_historical_return(df)
-    S = risk_models.CovarianceShrinkage(df).ledoit_wolf()
+    X2 = X * X
+    b2 = (np.sum(X2.T @ X2) / n - np.sum(S * S)) / (n * p)
+    b2 = min(b2, d2)
 
-    ef = EfficientFrontier(mu, S)
+    shrinkage = b2 / d2
+    return shrinkage * target + (1.0 - shrinkage) * S
 
-    if request.objective == "max_sharpe":
-        ef.max_sharpe(risk_free_rate=request.risk_free_rate)
-    elif request.objective == "min_volatility":
-        ef.min_volatility()
-    else:
-        ef.max_sharpe()
 
-    cleaned = ef.clean_weights()
-    perf = ef.portfolio_performance(risk_free_rate=request.risk_free_rate)
+def _psd_factor(S: np.ndarray) -> np.ndarray:
+    """Return L with L @ L.T == S, falling back to eigh if S is only semidefinite."""
+    try:
+        return np.linalg.cholesky(S)
+    except np.linalg.LinAlgError:
+        vals, vecs = np.linalg.eigh(S)
+        return vecs * np.sqrt(np.clip(vals, 0.0, None))
+
+
+# (n_assets, objective) -> (problem, params, weights_fn). Each pool worker keeps
+# its own cache, so CVXPY canonicalizes a given shape once per process and later
+# requests only rebind parameter values before solving.
+_PROBLEM_CACHE: Dict[Tuple[int, str], tuple] = {}
+# Cached problems hold mutable Parameters; with WEB_CONCURRENCY > 1 solves run on
+# threads, so bind + solve + read-back must not interleave.
+_SOLVE_LOCK = threading.Lock()
+
+
+def _build_problem(n: int, objective: str) -> tuple:
+    """Build the long-only DPP problem PyPortfolioOpt would solve for objective."""
+    import cvxpy as cp
+
+    # w' S w is written as ||L' w||^2 so the covariance enters as a plain
+    # Parameter; quad_form with a parametric matrix is not DPP.
+    L = cp.Parameter((n, n), name="L")
+
+    if objective == "min_volatility":
+        w = cp.Variable(n)
+        problem = cp.Problem(cp.Minimize(cp.sum_squares(L.T @ w)), [cp.sum(w) == 1, w >= 0])
+        return problem, {"L": L}, lambda: w.value
+
+    # Max Sharpe via the Cornuejols-Tutuncu change of variables (y = k * w),
+    # the same convex reformulation EfficientFrontier.max_sharpe uses.
+    excess = cp.Parameter(n, name="excess")
+    y = cp.Variable(n)
+    k = cp.Variable()
+    problem = cp.Problem(
+        cp.Minimize(cp.sum_squares(L.T @ y)),
+        [excess @ y == 1, cp.sum(y) == k, k >= 0, y >= 0, y <= k],
+    )
+    return problem, {"L": L, "excess": excess}, lambda: y.value / k.value
+
+
+def _run_optimize(req: OptimizeRequest) -> dict:
+    """Blocking CVXPY solve; module-level so it pickles into the pool."""
+    # T x N daily returns; stats are computed on the raw array, no DataFrame.
+    R = np.asarray(req.returns, dtype=np.float64).T
+
+    # Same formulas as pypfopt's mean_historical_return / CovarianceShrinkage
+    # with returns_data=True, annualized over TRADING_DAYS.
+    mu = (1.0 + R).prod(axis=0) ** (TRADING_DAYS / R.shape[0]) - 1.0
+    S = _ledoit_wolf(R) * TRADING_DAYS
+
+    objective = "min_volatility" if req.objective == "min_volatility" else "max_sharpe"
+    if objective == "max_sharpe" and not np.any(mu > req.risk_free_rate):
+        raise OptimizeInputError("at least one asset must have an expected return above the risk-free rate")
+
+    key = (len(mu), objective)
+    L = _psd_factor(S)
+    with _SOLVE_LOCK:
+        if key not in _PROBLEM_CACHE:
+            _PROBLEM_CACHE[key] = _build_problem(*key)
+        problem, params, weights_fn = _PROBLEM_CACHE[key]
+
+        params["L"].value = L
+        if "excess" in params:
+            params["excess"].value = mu - req.risk_free_rate
+
+        problem.solve(warm_start=True)
+        if problem.status not in ("optimal", "optimal_inaccurate"):
+            raise ValueError(f"optimization failed: {problem.status}")
+
+        weights = np.asarray(weights_fn(), dtype=np.float64)
+    expected_return = float(weights @ mu)
+    volatility = float(np.sqrt(weights @ S @ weights))
+
+    # Mirrors EfficientFrontier.clean_weights(cutoff=1e-4, rounding=5).
+    cleaned = np.round(np.where(np.abs(weights) < 1e-4, 0.0, weights), 5)
 
     return {
-        "weights": cleaned,
-        "expected_return": perf[0],
-        "volatility": perf[1],
-        "sharpe_ratio": perf[2],
+        "weights": dict(zip(req.symbols, cleaned.tolist())),
+        "expected_return": expected_return,
+        "volatility": volatility,
+        "sharpe_ratio": (expected_return - req.risk_free_rate) / volatility,
     }
 
 
+@app.post("/optimize")
+async def optimize(request: OptimizeRequest):
+    """Run mean-variance portfolio optimization in the process pool."""
+    # The ndarray path no longer fails on ragged or mismatched input the way the
+    # DataFrame did; zip(symbols, weights) would silently truncate instead.
+    if not request.symbols or len(request.returns) != len(request.symbols):
+        raise HTTPException(status_code=422, detail="returns must have exactly one row per symbol")
+    if len({len(row) for row in request.returns}) != 1 or len(request.returns[0]) < 2:
+        raise HTTPException(status_code=422, detail="returns rows must all have the same length (at least 2)")
+
+    loop = asyncio.get_running_loop()
+    # A worker killed mid-solve (OOM, native crash) leaves the pool permanently
+    # broken; rebuild it and retry once rather than failing every later request.
+    for attempt in range(2):
+        pool = EXECUTOR
+        try:
+            return await loop.run_in_executor(pool, _run_optimize, request)
+        except OptimizeInputError as exc:
+            raise HTTPException(status_code=422, detail=str(exc))
+        except BrokenProcessPool:
+            _replace_executor(pool)
+    raise HTTPException(status_code=503, detail="optimizer worker crashed; please retry")
+
+
 # ── /sentiment ─────────────────────────────────────────────────────────────
 
 
@@ -102,22 +271,20 @@ def _resolve_llm() -> Optional[Dict[str, str]]:
             "key": os.environ["DEEPSEEK_API_KEY"],
             "base": "https://api.deepseek.com/v1",
             "model": os.getenv("DEEPSEEK_MODEL", "deepseek-chat"),
+            "max_output": os.getenv("DEEPSEEK_MAX_OUTPUT_TOKENS", "8192"),
         }
     if os.getenv("OPENAI_API_KEY"):
         return {
             "key": os.environ["OPENAI_API_KEY"],
             "base": "https://api.openai.com/v1",
             "model": os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+            "max_output": os.getenv("OPENAI_MAX_OUTPUT_TOKENS", "16384"),
         }
     return None
 
 
-@app.post("/sentiment")
-async def analyze_sentiment(texts: List[str]):
+async def _classify_sentiment(texts: List[str]) -> List[Dict]:
     """Classify financial sentiment via DeepSeek/OpenAI; fallback to keyword heuristic."""
-    if not texts:
-        return []
-
     provider = _resolve_llm()
     if provider is None:
         return [_heuristic_sentiment(t).model_dump() for t in texts]
@@ -136,7 +303,8 @@ async def analyze_sentiment(texts: List[str]):
                         {"role": "user", "content": user_payload},
                     ],
                     "temperature": 0.2,
-                    "max_tokens": 600,
+                    # ~60 tokens per JSON object, clamped to the provider's output limit.
+                    "max_tokens": min(int(provider["max_output"]), max(600, 60 * len(texts))),
                 },
             )
 
@@ -165,10 +333,90 @@ async def analyze_sentiment(texts: List[str]):
         return [_heuristic_sentiment(t).model_dump() for t in texts]
 
 
+# Concurrent /sentiment callers are coalesced into one LLM request: the loop
+# waits up to SENTIMENT_BATCH_TIMEOUT after the first arrival, or until
+# SENTIMENT_MAX_BATCH texts are queued, then fans results back out by offset.
+SENTIMENT_MAX_BATCH = 32
+SENTIMENT_BATCH_TIMEOUT = 0.01
+
+
+async def _dispatch_sentiment(batch: List[Tuple[List[str], asyncio.Future]]) -> None:
+    all_texts = [t for texts, _ in batch for t in texts]
+    try:
+        results = await _classify_sentiment(all_texts)
+    except Exception as exc:
+        for _, fut in batch:
+            if not fut.done():
+                fut.set_exception(exc)
+        return
+
+    offset = 0
+    for texts, fut in batch:
+        if not fut.done():
+            fut.set_result(results[offset:offset + len(texts)])
+        offset += len(texts)
+
+
+async def _sentiment_loop(queue: asyncio.Queue) -> None:
+    loop = asyncio.get_running_loop()
+    pending = set()
+    carry = None
+    while True:
+        # A caller that didn't fit in the previous batch opens this one; a single
+        # caller larger than SENTIMENT_MAX_BATCH always goes out on its own.
+        first = carry if carry is not None else await queue.get()
+        carry = None
+        batch = [first]
+        size = len(first[0])
+        deadline = loop.time() + SENTIMENT_BATCH_TIMEOUT
+        while size < SENTIMENT_MAX_BATCH:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            if size + len(item[0]) > SENTIMENT_MAX_BATCH:
+                carry = item
+                break
+            batch.append(item)
+            size += len(item[0])
+
+        # Don't hold the next batch hostage to this one's HTTP round-trip.
+        task = asyncio.create_task(_dispatch_sentiment(batch))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+
+@app.on_event("startup")
+async def _start_sentiment_loop():
+    app.state.sentiment_queue = asyncio.Queue()
+    app.state.sentiment_task = asyncio.create_task(_sentiment_loop(app.state.sentiment_queue))
+
+
+@app.on_event("shutdown")
+async def _stop_sentiment_loop():
+    app.state.sentiment_task.cancel()
+
+
+@app.post("/sentiment")
+async def analyze_sentiment(texts: List[str]):
+    """Classify financial sentiment, micro-batched with other in-flight requests."""
+    if not texts:
+        return []
+
+    fut = asyncio.get_running_loop().create_future()
+    await app.state.sentiment_queue.put((texts, fut))
+    return await fut
+
+
 # ── entrypoint (Railway sets PORT) ─────────────────────────────────────────
 
 
 if __name__ == "__main__":
     import uvicorn
     port = int(os.environ.get("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    # Exported so each worker's startup hook sees the same value (see module docstring).
+    workers = int(os.environ.setdefault("WEB_CONCURRENCY", "1"))
+    uvicorn.run("main:app", host="0.0.0.0", port=port, workers=workers)
@@ -0,0 +1,124 @@
+"""
+Checks for the hand-rolled /optimize numerics and /sentiment micro-batching.
+Run from ml/: pip install -r requirements-dev.txt && pytest
+"""
+import asyncio
+
+import numpy as np
+import pytest
+from sklearn.covariance import ledoit_wolf
+
+import main
+from main import OptimizeRequest, _ledoit_wolf, _run_optimize, TRADING_DAYS, SENTIMENT_MAX_BATCH
+
+# ── _ledoit_wolf vs sklearn ────────────────────────────────────────────────
+
+
+@pytest.mark.parametrize("n,p", [(60, 5), (30, 1), (12, 20), (250, 40)])
+def test_ledoit_wolf_matches_sklearn(n, p):
+    rng = np.random.default_rng(n * 1000 + p)
+    R = rng.normal(0.0005, 0.02, size=(n, p)) + rng.normal(0, 0.01, size=(n, 1))
+    np.testing.assert_allclose(_ledoit_wolf(R), ledoit_wolf(R)[0], rtol=1e-10, atol=1e-14)
+
+
+# ── _run_optimize against closed-form optima ───────────────────────────────
+
+# Columns are a mean plus a scaled Hadamard vector, so the centered returns are
+# exactly orthogonal: the sample covariance, and therefore its Ledoit-Wolf
+# shrinkage toward m*I, is diagonal. With a diagonal S and every asset's excess
+# return positive, the long-only optima have closed forms:
+#   min volatility: w_i ∝ 1 / S_ii
+#   max Sharpe:     w_i ∝ (mu_i - rf) / S_ii
+HADAMARD = np.array([
+    [1, 1, 1],
+    [-1, 1, -1],
+    [1, -1, -1],
+    [-1, -1, 1],
+], dtype=np.float64)
+MEANS = np.array([0.0010, 0.0008, 0.0012])
+SCALES = np.array([0.010, 0.020, 0.015])
+RISK_FREE = 0.02
+
+
+def _fixture():
+    R = np.tile(MEANS + SCALES * HADAMARD, (2, 1))  # T=8 x N=3
+    req = OptimizeRequest(symbols=["AAA", "BBB", "CCC"], returns=R.T.tolist(), risk_free_rate=RISK_FREE)
+    mu = (1.0 + R).prod(axis=0) ** (TRADING_DAYS / R.shape[0]) - 1.0
+    S = ledoit_wolf(R)[0] * TRADING_DAYS
+    return req, mu, S
+
+
+def _weights(result):
+    return np.array([result["weights"][s] for s in ("AAA", "BBB", "CCC")])
+
+
+@pytest.mark.parametrize("objective", ["min_volatility", "max_sharpe"])
+def test_run_optimize_matches_closed_form(objective):
+    req, mu, S = _fixture()
+    assert np.allclose(S, np.diag(np.diag(S)))
+    assert np.all(mu > RISK_FREE)
+
+    numer = np.ones(3) if objective == "min_volatility" else mu - RISK_FREE
+    expected = numer / np.diag(S)
+    expected /= expected.sum()
+
+    result = _run_optimize(req.model_copy(update={"objective": objective}))
+    w = _weights(result)
+
+    assert np.all(w >= 0)
+    assert w.sum() == pytest.approx(1.0, abs=1e-4)
+    np.testing.assert_allclose(w, expected, atol=1e-4)
+    assert result["expected_return"] == pytest.approx(expected @ mu, rel=1e-3)
+    assert result["volatility"] == pytest.approx(np.sqrt(expected @ S @ expected), rel=1e-3)
+
+
+def test_run_optimize_reuses_cached_problem_for_new_data():
+    req, _, _ = _fixture()
+    first = _weights(_run_optimize(req))
+
+    # Same shape, different numbers: the cached problem must pick up the new values.
+    flipped = req.model_copy(update={"returns": [list(reversed(row)) for row in req.returns[::-1]]})
+    second = _weights(_run_optimize(flipped))
+
+    assert second.sum() == pytest.approx(1.0, abs=1e-4)
+    assert not np.allclose(first, second)
+
+
+# ── /sentiment batching ────────────────────────────────────────────────────
+
+
+def test_sentiment_batches_respect_cap_and_fan_out_in_order(monkeypatch):
+    batches = []
+
+    async def fake_classify(texts):
+        batches.append(list(texts))
+        await asyncio.sleep(0.005)
+        return [{"label": t} for t in texts]
+
+    monkeypatch.setattr(main, "_classify_sentiment", fake_classify)
+
+    # 40 small callers with one oversized caller landing in the middle.
+    callers = {cid: [f"{cid}:{j}" for j in range(1 + cid % 3)] for cid in range(40)}
+    callers[99] = [f"99:{j}" for j in range(100)]
+    order = list(range(20)) + [99] + list(range(20, 40))
+
+    async def run():
+        queue = asyncio.Queue()
+        main.app.state.sentiment_queue = queue
+        loop_task = asyncio.create_task(main._sentiment_loop(queue))
+        try:
+            return await asyncio.gather(*(main.analyze_sentiment(callers[cid]) for cid in order))
+        finally:
+            loop_task.cancel()
+
+    results = asyncio.run(run())
+
+    for cid, result in zip(order, results):
+        assert [r["label"] for r in result] == callers[cid]
+
+    for batch in batches:
+        caller_ids = {t.split(":")[0] for t in batch}
+        if len(caller_ids) > 1:
+            assert len(batch) <= SENTIMENT_MAX_BATCH
+    assert [t for t in batches if t[0].startswith("99:")] == [callers[99]]
+    assert sum(len(b) for b in batches) == sum(len(t) for t in callers.values())
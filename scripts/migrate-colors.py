@@ -2,7 +2,15 @@
 """Migrate all hardcoded Tailwind colors to CSS variables in components."""
 import re
 import os
-import glob
+import mmap
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from pathlib import Path
+
+try:
+    import hyperscan  # optional: pip install hyperscan
+except ImportError:
+    hyperscan = None
 
 COMPONENTS_DIR = "client/src/components"
 
@@ -32,184 +40,255 @@ ALL_COLORS = '|'.join(sorted(COLOR_SEMANTIC.keys(), key=len, reverse=True))
 ALL_COLORS_PLUS_GRAY = '|'.join(sorted({**COLOR_SEMANTIC, 'gray': 'text-muted', 'slate': 'text-muted'}.keys(), key=len, reverse=True))
 
 
+# =========================================================================
+# STANDALONE HEX COLORS (in Recharts, SVG, etc.)
+# =========================================================================
+# Common hex → CSS var (only in stroke/fill/color contexts)
+HEX_MAP = {
+    '#e5e7eb': 'var(--color-border)',
+    '#d1d5db': 'var(--color-border)',
+    '#9ca3af': 'var(--color-text-muted)',
+    '#6b7280': 'var(--color-text-muted)',
+    '#4b5563': 'var(--color-text-secondary)',
+    '#374151': 'var(--color-text)',
+}
+ALL_HEX = '|'.join(re.escape(h) for h in HEX_MAP)
+
+# Every hardcoded color in one pass: kind-COLOR-SHADE with optional /OPACITY,
+# or one of the HEX_MAP literals. Variant prefixes (hover:, dark:, focus:, ...)
+# sit outside the match and are left untouched.
+CLASS_EXPR = rf'(?P<kind>text|bg|border|ring)-(?P<color>{ALL_COLORS_PLUS_GRAY})-(?P<shade>\d+)(?:/(?P<opacity>\d+))?'
+HEX_EXPR = rf'(?P<hex>{ALL_HEX})'
+PATTERN = re.compile(f'{CLASS_EXPR}|{HEX_EXPR}')
+
+REMAINING_PATTERN = re.compile(rf'(?:text|bg|border|ring)-(?:{ALL_COLORS_PLUS_GRAY})-\d+')
+
+# Every class PATTERN can match contains "-COLOR-", and every hex replacement
+# its literal. Files with none of these can't change, so they skip decoding and
+# regex work after a few bytes.find scans. (text-/bg- alone would not help:
+# already-migrated text-[var(...)] classes contain them too.)
+PRESCREEN = tuple(f'-{c}-'.encode() for c in ALL_COLORS_PLUS_GRAY.split('|')) + tuple(
+    h.encode() for h in HEX_MAP
+)
+
+# Above this size the prescreen runs against an mmap of the page cache
+# instead of copying the whole file into a bytes object first.
+MMAP_THRESHOLD = 1 << 20
+
+
+def _build_hs_database():
+    """Compile PATTERN (minus named groups, which Hyperscan lacks) into a DFA."""
+    db = hyperscan.Database()
+    expressions = [
+        rf'(?:text|bg|border|ring)-(?:{ALL_COLORS_PLUS_GRAY})-\d+(?:/\d+)?'.encode(),
+        ALL_HEX.encode(),
+    ]
+    db.compile(
+        expressions=expressions,
+        ids=list(range(len(expressions))),
+        elements=len(expressions),
+        flags=[hyperscan.HS_FLAG_SOM_LEFTMOST] * len(expressions),
+    )
+    return db
+
+
+HS_DATABASE = _build_hs_database() if hyperscan else None
+
+
 def get_semantic(color):
     """Get semantic CSS variable name for a color."""
     return COLOR_SEMANTIC.get(color, 'info')
 
 
-def migrate_content(content):
-    """Migrate all hardcoded Tailwind colors in content."""
+# =========================================================================
+# 1. OPACITY PATTERNS: bg/border-COLOR-NUM/OPACITY → bg-[rgba(R,G,B,OPACITY)]
+# =========================================================================
+def replace_opacity(kind, color, opacity):
+    rgba = COLOR_RGBA.get(color)
+    if rgba:
+        return f'{kind}-[rgba({rgba},{int(opacity) / 100})]'
+    return None
+
+
+# =========================================================================
+# 2. TEXT COLORS: text-COLOR-NUM → text-[var(--color-SEMANTIC)]
+# =========================================================================
+def replace_text(color, shade):
+    if color in ('gray', 'slate'):
+        if shade >= 800:
+            return 'text-[var(--color-text)]'
+        elif shade >= 600:
+            return 'text-[var(--color-text-secondary)]'
+        else:
+            return 'text-[var(--color-text-muted)]'
+    sem = get_semantic(color)
+    return f'text-[var(--color-{sem})]'
+
+
+# =========================================================================
+# 3. SOLID BG: bg-COLOR-NUM → bg-[var(--color-SEMANTIC)]
+# =========================================================================
+def replace_bg_solid(color, shade):
+    if color in ('gray', 'slate'):
+        if shade <= 100:
+            return 'bg-[var(--color-bg)]'
+        elif shade <= 300:
+            return 'bg-[var(--color-bg-secondary)]'
+        else:
+            return 'bg-[var(--color-bg-tertiary)]'
+    sem = get_semantic(color)
+    return f'bg-[var(--color-{sem})]'
+
+
+# =========================================================================
+# 4. BORDER: border-COLOR-NUM → border-[var(--color-SEMANTIC)]
+# =========================================================================
+def replace_border(color, shade):
+    if color in ('gray', 'slate'):
+        return 'border-[var(--color-border)]'
+    sem = get_semantic(color)
+    return f'border-[var(--color-{sem})]'
+
+
+# =========================================================================
+# 5. RING/FOCUS: ring-COLOR-NUM → ring-[var(--color-accent)]
+# =========================================================================
+def replace_ring(color, shade):
+    sem = get_semantic(color) if color in COLOR_SEMANTIC else 'accent'
+    return f'ring-[var(--color-{sem})]'
+
+
+SOLID_REPLACERS = {
+    'text': replace_text,
+    'bg': replace_bg_solid,
+    'border': replace_border,
+    'ring': replace_ring,
+}
 
-    # =========================================================================
-    # 1. OPACITY PATTERNS FIRST (before solid patterns eat the base)
-    # bg-COLOR-NUM/OPACITY → bg-[rgba(R,G,B,OPACITY)]
-    # =========================================================================
-    def replace_bg_opacity(m):
-        color = m.group(1)
-        opacity = int(m.group(3)) / 100
-        rgba = COLOR_RGBA.get(color)
-        if rgba:
-            return f'bg-[rgba({rgba},{opacity})]'
-        return m.group(0)
-
-    content = re.sub(
-        rf'bg-({ALL_COLORS_PLUS_GRAY})-(\d+)/(\d+)',
-        replace_bg_opacity, content
-    )
 
-    # border-COLOR-NUM/OPACITY → border-[rgba(R,G,B,OPACITY)]
-    def replace_border_opacity(m):
-        color = m.group(1)
-        opacity = int(m.group(3)) / 100
-        rgba = COLOR_RGBA.get(color)
-        if rgba:
-            return f'border-[rgba({rgba},{opacity})]'
-        return m.group(0)
-
-    content = re.sub(
-        rf'border-({ALL_COLORS_PLUS_GRAY})-(\d+)/(\d+)',
-        replace_border_opacity, content
-    )
+def migrate_class(kind, color, shade, opacity):
+    """Replacement for one kind-COLOR-SHADE[/OPACITY] class."""
+    if opacity is not None and kind in ('bg', 'border'):
+        return replace_opacity(kind, color, opacity) or f'{kind}-{color}-{shade}/{opacity}'
+    replaced = SOLID_REPLACERS[kind](color, int(shade))
+    # text/ring keep Tailwind's opacity suffix as-is
+    return replaced if opacity is None else f'{replaced}/{opacity}'
 
-    # hover:bg-COLOR-NUM/OPACITY
-    def replace_hover_bg_opacity(m):
-        color = m.group(1)
-        opacity = int(m.group(3)) / 100
-        rgba = COLOR_RGBA.get(color)
-        if rgba:
-            return f'hover:bg-[rgba({rgba},{opacity})]'
-        return m.group(0)
-
-    content = re.sub(
-        rf'hover:bg-({ALL_COLORS_PLUS_GRAY})-(\d+)/(\d+)',
-        replace_hover_bg_opacity, content
-    )
 
-    # =========================================================================
-    # 2. TEXT COLORS: text-COLOR-NUM → text-[var(--color-SEMANTIC)]
-    # =========================================================================
-    def replace_text(m):
-        prefix = m.group(1) or ''  # hover: or dark: prefix
-        color = m.group(2)
-        if color in ('gray', 'slate'):
-            shade = int(m.group(3))
-            if shade >= 800:
-                return f'{prefix}text-[var(--color-text)]'
-            elif shade >= 600:
-                return f'{prefix}text-[var(--color-text-secondary)]'
-            else:
-                return f'{prefix}text-[var(--color-text-muted)]'
-        sem = get_semantic(color)
-        return f'{prefix}text-[var(--color-{sem})]'
-
-    content = re.sub(
-        rf'((?:hover:|dark:|focus:)?)?text-({ALL_COLORS_PLUS_GRAY})-(\d+)',
-        replace_text, content
-    )
+# Tailwind's default shade and opacity scales
+TAILWIND_SHADES = ('50', '100', '200', '300', '400', '500', '600', '700', '800', '900', '950')
+TAILWIND_OPACITIES = tuple(str(o) for o in range(0, 101, 5))
 
-    # =========================================================================
-    # 3. SOLID BG: bg-COLOR-NUM → bg-[var(--color-SEMANTIC)]
-    # =========================================================================
-    def replace_bg_solid(m):
-        prefix = m.group(1) or ''
-        color = m.group(2)
-        shade = int(m.group(3))
-        if color in ('gray', 'slate'):
-            if shade <= 100:
-                return f'{prefix}bg-[var(--color-bg)]'
-            elif shade <= 300:
-                return f'{prefix}bg-[var(--color-bg-secondary)]'
-            else:
-                return f'{prefix}bg-[var(--color-bg-tertiary)]'
-        sem = get_semantic(color)
-        return f'{prefix}bg-[var(--color-{sem})]'
-
-    content = re.sub(
-        rf'((?:hover:|dark:|active:|focus:)?)?bg-({ALL_COLORS_PLUS_GRAY})-(\d+)(?!/)',
-        replace_bg_solid, content
-    )
 
-    # =========================================================================
-    # 4. BORDER: border-COLOR-NUM → border-[var(--color-SEMANTIC)]
-    # =========================================================================
-    def replace_border(m):
-        color = m.group(1)
-        if color in ('gray', 'slate'):
-            return 'border-[var(--color-border)]'
-        sem = get_semantic(color)
-        return f'border-[var(--color-{sem})]'
-
-    content = re.sub(
-        rf'border-({ALL_COLORS_PLUS_GRAY})-(\d+)(?!/)',
-        replace_border, content
-    )
+def _build_replacements():
+    """Precompute every on-scale match → replacement so _dispatch is one lookup."""
+    table = dict(HEX_MAP)
+    for kind in SOLID_REPLACERS:
+        for color in ALL_COLORS_PLUS_GRAY.split('|'):
+            for shade in TAILWIND_SHADES:
+                table[f'{kind}-{color}-{shade}'] = migrate_class(kind, color, shade, None)
+                for opacity in TAILWIND_OPACITIES:
+                    table[f'{kind}-{color}-{shade}/{opacity}'] = migrate_class(kind, color, shade, opacity)
+    return table
 
-    # =========================================================================
-    # 5. RING/FOCUS: ring-COLOR-NUM → ring-[var(--color-accent)]
-    # =========================================================================
-    def replace_ring(m):
-        prefix = m.group(1) or ''
-        color = m.group(2)
-        sem = get_semantic(color) if color in COLOR_SEMANTIC else 'accent'
-        return f'{prefix}ring-[var(--color-{sem})]'
-
-    content = re.sub(
-        rf'((?:focus:)?)?ring-({ALL_COLORS_PLUS_GRAY})-(\d+)',
-        replace_ring, content
-    )
 
-    # =========================================================================
-    # 6. STANDALONE HEX COLORS (in Recharts, SVG, etc.)
-    # =========================================================================
-    # Common hex → CSS var (only in stroke/fill/color contexts)
-    hex_map = {
-        '#e5e7eb': 'var(--color-border)',
-        '#d1d5db': 'var(--color-border)',
-        '#9ca3af': 'var(--color-text-muted)',
-        '#6b7280': 'var(--color-text-muted)',
-        '#4b5563': 'var(--color-text-secondary)',
-        '#374151': 'var(--color-text)',
-    }
-    for hex_val, css_var in hex_map.items():
-        content = content.replace(hex_val, css_var)
-
-    return content
-
-
-def count_remaining(filepath):
-    """Count remaining hardcoded color classes."""
-    with open(filepath, 'r') as f:
-        content = f.read()
+REPLACEMENTS = _build_replacements()
+
 
-    colors = ALL_COLORS_PLUS_GRAY.replace('|', '|')
-    pattern = rf'(?:text|bg|border|ring)-(?:{colors})-\d+'
-    matches = re.findall(pattern, content)
+def _dispatch(m):
+    replaced = REPLACEMENTS.get(m.group(0))
+    if replaced is None:
+        # Off-scale shade/opacity (e.g. bg-red-500/33)
+        replaced = migrate_class(*m.group('kind', 'color', 'shade', 'opacity'))
+    return replaced
+
+
+def _sub_hyperscan(content):
+    """PATTERN.sub(_dispatch, content), with Hyperscan locating the matches."""
+    data = content.encode()
+
+    # Hyperscan reports every end offset (each digit of \d+); keep the longest
+    # match per start to get the same spans as the greedy re engine.
+    spans = {}
+
+    def on_match(_id, start, end, _flags, _context):
+        if end > spans.get(start, -1):
+            spans[start] = end
+
+    HS_DATABASE.scan(data, match_event_handler=on_match)
+    if not spans:
+        return content
+
+    out = []
+    pos = 0
+    for start in sorted(spans):
+        end = spans[start]
+        out.append(data[pos:start])
+        # Matched spans are pure ASCII, so re-matching the slice is cheap and exact.
+        out.append(_dispatch(PATTERN.fullmatch(data[start:end].decode())).encode())
+        pos = end
+    out.append(data[pos:])
+    return b''.join(out).decode()
+
+
+def migrate_content(content):
+    """Migrate all hardcoded Tailwind colors in content."""
+    if HS_DATABASE is not None:
+        return _sub_hyperscan(content)
+    return PATTERN.sub(_dispatch, content)
+
+
+def count_remaining(content):
+    """Count remaining hardcoded color classes."""
+    matches = REMAINING_PATTERN.findall(content)
     return len(matches), matches
 
 
+def process(filepath):
+    """Migrate one file in place; returns (filepath, modified, remaining, matches)."""
+    with open(filepath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if not any(mm.find(tok) != -1 for tok in PRESCREEN):
+                    return filepath, False, 0, []
+                data = mm[:]
+        else:
+            data = f.read()
+            if not any(tok in data for tok in PRESCREEN):
+                return filepath, False, 0, []
+
+    original = data.decode()
+    content = migrate_content(original)
+    changed = content != original
+    if changed:
+        # Mirror the read: raw UTF-8 bytes, no locale encoding or newline translation.
+        with open(filepath, 'wb') as f:
+            f.write(content.encode())
+
+    # Counted on the in-memory result, so neither pass re-reads the file.
+    count, remaining = count_remaining(content)
+    return filepath, changed, count, remaining
+
+
 def main():
     os.chdir('/Users/dicoangelo/projects/products/frontier-alpha')
 
-    files = sorted(glob.glob(f'{COMPONENTS_DIR}/**/*.tsx', recursive=True))
-    files += sorted(glob.glob('client/src/pages/**/*.tsx', recursive=True))
+    # Streamed straight from the directory walk; output follows walk order.
+    files = chain(Path(COMPONENTS_DIR).rglob('*.tsx'), Path('client/src/pages').rglob('*.tsx'))
 
     modified = 0
     total_files = 0
-
-    for filepath in files:
-        with open(filepath, 'r') as f:
-            original = f.read()
-
-        content = migrate_content(original)
-        total_files += 1
-
-        if content != original:
-            with open(filepath, 'w') as f:
-                f.write(content)
-            modified += 1
-            count, remaining = count_remaining(filepath)
-            status = "CLEAN" if count == 0 else f"{count} remaining: {remaining[:5]}"
-            print(f"  MODIFIED: {filepath} — {status}")
+    results = []
+
+    # Files are independent and the work is CPU-bound; map() keeps output in walk order.
+    with ProcessPoolExecutor() as ex:
+        for filepath, changed, count, remaining in ex.map(process, files, chunksize=16):
+            total_files += 1
+            results.append((filepath, count, remaining))
+            if changed:
+                modified += 1
+                status = "CLEAN" if count == 0 else f"{count} remaining: {remaining[:5]}"
+                print(f"  MODIFIED: {filepath} — {status}")
 
     print(f"\n{'='*60}")
     print(f"Modified {modified}/{total_files} files")
@@ -217,8 +296,7 @@ def main():
     # Summary of remaining
     print(f"\nRemaining hardcoded colors:")
     total_remaining = 0
-    for filepath in files:
-        count, remaining = count_remaining(filepath)
+    for filepath, count, remaining in results:
         if count > 0:
             total_remaining += count
             print(f"  {count:3d} {filepath} — {remaining[:5]}")